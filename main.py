@@ -3,31 +3,104 @@ import logging
 import os
 from wolf3d.palette import *
 import mapexporter
+import mapcatalog
+import mipmaps
 
 logging.basicConfig(level=logging.INFO)
 
 
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0: {value}")
+    return number
+
+
+def positive_float(value):
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0: {value}")
+    return number
+
+
 def export_map(args):
-    palette = load_palette("palettes/Wolf3D.pal")
+    palette = None if args.no_textures else load_palette("palettes/Wolf3D.pal")
     gamemapsfile = os.path.join(args.inpath, "GAMEMAPS.WL6")
     vswapfile = os.path.join(args.inpath, "VSWAP.WL6")
     mapexporter.EXPORT_FLOORS = not args.nofloor
     mapexporter.EXPORT_CEILINGS = not args.noceiling
+    mapexporter.EXPORT_COLLISION = args.collision
+    mapexporter.EXPORT_TEXTURES = not args.no_textures
     mapexporter.EXPORT_PATH = args.outpath
-    mapexporter.export_map(gamemapsfile, vswapfile, palette, args.map)
+    mapexporter.TEXTURE_SCALE = args.texture_scale
+    mapexporter.EXPORT_MIPMAPS = args.mipmaps
+    mapexporter.MIPMAP_FILTER = args.mip_filter
+    mapexporter.MIPMAP_FORMAT = args.mip_format
+    if args.watch:
+        mapexporter.watch_maps(gamemapsfile, vswapfile, palette, args.map, args.threads, args.interval)
+    else:
+        mapexporter.export_maps(gamemapsfile, vswapfile, palette, args.map, args.threads)
+
+
+def list_maps(args):
+    gamemapsfile = os.path.join(args.inpath, "GAMEMAPS.WL6")
+    catalogfile = os.path.join(args.outpath, mapcatalog.CATALOG_NAME)
+    entries = mapcatalog.load_catalog(gamemapsfile, catalogfile)
+    if args.map is not None:
+        found = []
+        for index in args.map:
+            entry = mapcatalog.find_map(entries, index)
+            if entry is None:
+                raise SystemExit(f"Map {index} not found.")
+            found.append(entry)
+        entries = found
+    for entry in entries:
+        print(f"{entry['index']:3}  {entry['name']:16}  {entry['width']}x{entry['height']}  "
+              f"rooms: {entry['rooms']:3}  doors: {entry['doors']:3}  textures: {len(entry['textures'])}")
 
 
 def main():
     parser = argparse.ArgumentParser(description="A tool to convert Wolfenstein 3D maps to OBJ files.")
     parser.add_argument("-i", "--inpath", type=str, help="The path to the game data.", required=True)
-    parser.add_argument("-m", "--map", type=int, help="The map number to export (0-based).", required=True)
+    parser.add_argument("-m", "--map", type=int, nargs="+", help="The map number(s) to export (0-based).")
     parser.add_argument("-o", "--outpath", type=str, help="The path to export the OBJ data to.")
     parser.add_argument("--nofloor", action='store_true', help="Disables exporting of floor faces.")
     parser.add_argument("--noceiling", action='store_true', help="Disables exporting of ceiling faces.")
-    parser.set_defaults(outpath="export")
+    parser.add_argument("--collision", action='store_true', help="Also exports a collision and navigation file.")
+    parser.add_argument("--no-textures", action='store_true',
+                        help="Exports geometry only. VSWAP is not read and no textures are written.")
+    parser.add_argument("--texture-scale", type=int, choices=(1, 2, 4, 8, 16),
+                        help="The power-of-two factor to upscale textures by.")
+    parser.add_argument("--mipmaps", action='store_true', help="Also exports a full mip chain for each texture.")
+    parser.add_argument("--mip-filter", choices=mipmaps.MIP_FILTERS, help="The filter used to build mip levels.")
+    parser.add_argument("--mip-format", choices=("png", "ktx"),
+                        help="Write one PNG per mip level or a single KTX file per texture.")
+    parser.add_argument("--threads", type=positive_int,
+                        help="The number of threads in each of the map and texture export pools.")
+    parser.add_argument("--watch", action='store_true', help="Keeps running and re-exports maps when they change.")
+    parser.add_argument("--interval", type=positive_float, help="The number of seconds between checks for changes in watch mode.")
+    parser.add_argument("--list", action='store_true', help="Lists the maps in the game data using a cached catalog.")
+    parser.set_defaults(outpath="export", interval=0.5)
     # parser.print_help()
     args = parser.parse_args()
-    export_map(args)
+    # The texture options default to None so that --no-textures can reject them.
+    if args.no_textures:
+        for option, value in (("--texture-scale", args.texture_scale), ("--mipmaps", args.mipmaps or None),
+                              ("--mip-filter", args.mip_filter), ("--mip-format", args.mip_format)):
+            if value is not None:
+                parser.error(f"argument {option}: not allowed with argument --no-textures")
+    if args.texture_scale is None:
+        args.texture_scale = 1
+    if args.mip_filter is None:
+        args.mip_filter = "box"
+    if args.mip_format is None:
+        args.mip_format = "png"
+    if args.list:
+        list_maps(args)
+    elif args.map is None:
+        parser.error("the following arguments are required: -m/--map")
+    else:
+        export_map(args)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import logging
+import os
+from wolf3d.gamemaps import *
+from wolf3d.utils import file_stamp, find_file
+import mapexporter
+
+logger = logging.getLogger("mapcatalog")
+
+CATALOG_NAME = "catalog.json"
+CATALOG_VERSION = 1
+
+
+def _get_stamps(gamemapsfile):
+    """The catalog is only valid while both MAPHEAD and GAMEMAPS are unchanged."""
+    headerfile = find_file(gamemapsfile, GameMaps.MAPHEAD_NAME)
+    return {
+        "maphead": file_stamp(headerfile),
+        "gamemaps": file_stamp(gamemapsfile),
+    }
+
+
+def build_catalog(gamemapsfile):
+    # The room scan warns about every door or marker it cannot place, which would bury the listing.
+    exporter_logger = logging.getLogger("mapexporter")
+    previous_level = exporter_logger.level
+    exporter_logger.setLevel(logging.ERROR)
+    try:
+        return _build_catalog(gamemapsfile)
+    finally:
+        exporter_logger.setLevel(previous_level)
+
+
+def _build_catalog(gamemapsfile):
+    entries = []
+    with GameMaps(gamemapsfile) as maps:
+        for index in range(len(maps.header.offsets)):
+            if not maps.has_map(index):
+                continue
+            info = maps.load_map_info(index)
+            planes = [maps.read_plane(info, plane) for plane in range(maps.MAPPLANES)]
+            gamemap = maps.decode_map(info, planes)
+            rooms = mapexporter.scan_for_rooms(gamemap)
+            entries.append({
+                "index": index,
+                "name": info.name.decode("latin-1"),
+                "width": info.width,
+                "height": info.height,
+                "plane_start": list(info.plane_start),
+                "plane_length": list(info.plane_length),
+                "plane_hashes": [hashlib.sha1(plane_data).hexdigest() for plane_data in planes],
+                "rooms": len(rooms),
+                "doors": mapexporter.count_doors(gamemap),
+                "textures": mapexporter.get_used_texture_ids(gamemap),
+            })
+    return entries
+
+
+def load_catalog(gamemapsfile, catalogfile):
+    """Returns the catalog entries for `gamemapsfile`, rebuilding `catalogfile` when it is missing or stale."""
+    stamps = _get_stamps(gamemapsfile)
+    try:
+        with open(catalogfile, "r") as f:
+            catalog = json.load(f)
+        if not isinstance(catalog, dict) or not isinstance(catalog.get("maps"), list):
+            logger.warning(f"Could not read catalog: {catalogfile}")
+        elif catalog.get("version") == CATALOG_VERSION and catalog.get("stamps") == stamps:
+            return catalog["maps"]
+        else:
+            logger.info(f"Catalog is out of date: {catalogfile}")
+    except FileNotFoundError:
+        pass
+    except ValueError:
+        logger.warning(f"Could not read catalog: {catalogfile}")
+    logger.info(f"Building catalog for {gamemapsfile}")
+    entries = build_catalog(gamemapsfile)
+    os.makedirs(os.path.dirname(catalogfile) or ".", exist_ok=True)
+    with open(catalogfile, "w") as f:
+        json.dump({"version": CATALOG_VERSION, "stamps": stamps, "maps": entries}, f, indent=1)
+    return entries
+
+
+def find_map(entries, index):
+    for entry in entries:
+        if entry["index"] == index:
+            return entry
+    return None
@@ -1,10 +1,16 @@
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait as wait_for_futures
 from math import sqrt
 from wolf3d.gamemaps import *
 from wolf3d.vswap import *
+from wolf3d.utils import file_stamp, find_file
 from model.objfile import ObjFile
 from model.mtlfile import MtlFile
+from model.collisionfile import CollisionFile
+import mipmaps
 
 logger = logging.getLogger("mapexporter")
 
@@ -31,6 +37,12 @@ _FACING_EW = 1
 # EXPORT SETTINGS
 EXPORT_FLOORS = True
 EXPORT_CEILINGS = True
+EXPORT_COLLISION = False
+EXPORT_TEXTURES = True  # When False, VSWAP is not read and materials have no texture maps.
+TEXTURE_SCALE = 1  # Power-of-two upscale factor.
+EXPORT_MIPMAPS = False
+MIPMAP_FILTER = "box"  # "nearest" or "box"
+MIPMAP_FORMAT = "png"  # "png" for one file per level or "ktx" for a single container.
 EXPORT_PATH = "export"
 
 
@@ -66,7 +78,7 @@ def _get_flat_face(x1, z1, x2, z2, y):
     return v, t, n
 
 
-def _scan_for_rooms(gamemap: GameMap):
+def scan_for_rooms(gamemap: GameMap):
     rooms = {}
 
     def add_tile_to_room(floorcode, tx, ty):
@@ -123,7 +135,108 @@ def _scan_for_rooms(gamemap: GameMap):
     return rooms
 
 
-def _export_rooms(gamemap, mapindex, vswap, rooms):
+def _get_wall_texture_id(wallcode, facing):
+    return (wallcode - 1) * 2 + facing
+
+
+def get_used_texture_ids(gamemap: GameMap):
+    """Returns the sorted VSWAP wall chunk indices referenced by the wall plane."""
+    texture_ids = set()
+    for row in gamemap.tiles[WALL_PLANE]:
+        for code in row:
+            if code in WALL_CODES:
+                texture_ids.add(_get_wall_texture_id(code, _FACING_NS))
+                texture_ids.add(_get_wall_texture_id(code, _FACING_EW))
+            elif code in DOOR_EW_CODES:
+                door_index = DOOR_EW_CODES.index(code)
+                texture_ids.add(DOOR_EW_PICS[door_index])
+                texture_ids.add(DOOR_EW_SIDES[door_index])
+            elif code in DOOR_NS_CODES:
+                door_index = DOOR_NS_CODES.index(code)
+                texture_ids.add(DOOR_NS_PICS[door_index])
+                texture_ids.add(DOOR_NS_SIDES[door_index])
+    return sorted(texture_ids)
+
+
+def count_doors(gamemap: GameMap):
+    return sum(1 for row in gamemap.tiles[WALL_PLANE] for code in row
+               if code in DOOR_EW_CODES or code in DOOR_NS_CODES)
+
+
+class TextureExporter:
+    """Writes each texture image once, even when it is shared by maps exported on different threads.
+    Scaling, mipmapping and saving run on a separate thread pool.
+    Without a Vswap, only the texture names are generated.
+    """
+
+    def __init__(self, vswap, threads=None):
+        self.vswap = vswap
+        self._lock = threading.Lock()
+        self._exported = set()
+        self._executor = ThreadPoolExecutor(max_workers=threads)
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Waits for all pending texture writes. Raises the first error, if any."""
+        self._executor.shutdown(wait=True)
+        self.wait()
+
+    def wait(self):
+        """Waits for the pending texture writes. Raises the first error, if any."""
+        with self._lock:
+            futures = self._futures
+            self._futures = []
+        wait_for_futures(futures)
+        for future in futures:
+            future.result()
+
+    def export(self, texture_type, texture_id):
+        texture_name = f"{texture_type}{texture_id:03}"
+        if self.vswap is None:
+            return texture_name
+        with self._lock:
+            if texture_name in self._exported:
+                return texture_name
+            self._exported.add(texture_name)
+        try:
+            logger.info(f"Exporting {texture_name}")
+            image = self.vswap.load_wall(texture_id)
+        except BaseException:
+            self._forget(texture_name)
+            raise
+        future = self._executor.submit(self._save_texture, texture_name, image)
+        with self._lock:
+            self._futures.append(future)
+        return texture_name
+
+    def _forget(self, texture_name):
+        """Lets a texture that failed to export be tried again."""
+        with self._lock:
+            self._exported.discard(texture_name)
+
+    def _save_texture(self, texture_name, image):
+        try:
+            image = mipmaps.scale_image(image, TEXTURE_SCALE)
+            basename = os.path.join(EXPORT_PATH, texture_name)
+            if not EXPORT_MIPMAPS:
+                image.save(f"{basename}.png")
+            elif MIPMAP_FORMAT == "ktx":
+                image.save(f"{basename}.png")
+                mipmaps.save_ktx(mipmaps.build_mip_chain(image, MIPMAP_FILTER), f"{basename}.ktx")
+            else:
+                mipmaps.save_png_levels(mipmaps.build_mip_chain(image, MIPMAP_FILTER), basename)
+        except BaseException:
+            self._forget(texture_name)
+            raise
+
+
+def _export_rooms(gamemap, mapindex, texture_exporter, rooms):
     obj = ObjFile()
     mtl = MtlFile()
     mtl.start_material("floor")
@@ -133,9 +246,6 @@ def _export_rooms(gamemap, mapindex, vswap, rooms):
 
     textures = []
 
-    def get_wall_texture_id(wallcode, facing):
-        return (wallcode - 1) * 2 + facing
-
     # noinspection PyShadowingNames
     def add_face_to_texture_group(group_name, face):
         if group_name not in texture_groups:
@@ -144,14 +254,12 @@ def _export_rooms(gamemap, mapindex, vswap, rooms):
 
     # noinspection PyShadowingNames
     def load_texture(texture_type, texture_id):
-        texture_name = f"{texture_type}{texture_id:03}"
-        if texture_id not in textures:
-            logger.info(f"Exporting {texture_name}")
-            textures.append(texture_id)
-            image = vswap.load_wall(texture_id)
-            image.save(os.path.join(EXPORT_PATH, f"{texture_name}.png"))
+        texture_name = texture_exporter.export(texture_type, texture_id)
+        if texture_name not in textures:
+            textures.append(texture_name)
             mtl.start_material(texture_name)
-            mtl.set_color_texture(f"{texture_name}.png")
+            if texture_exporter.vswap is not None:
+                mtl.set_color_texture(f"{texture_name}.png")
         return texture_name
 
     def add_if_wall(testx, testy, facing, tx1, ty1, tx2, ty2):
@@ -161,7 +269,7 @@ def _export_rooms(gamemap, mapindex, vswap, rooms):
             if wallcode in WALL_CODES and \
                     not gamemap.tiles[OBJECT_PLANE][testy][testx] in PUSHWALL_CODES:
                 # noinspection PyShadowingNames
-                texture_id = get_wall_texture_id(wallcode, facing)
+                texture_id = _get_wall_texture_id(wallcode, facing)
                 # noinspection PyShadowingNames
                 name = load_texture("wall", texture_id)
                 add_face_to_texture_group(name, _get_wall_face(tx1, ty1, tx2, ty2))
@@ -213,9 +321,9 @@ def _export_rooms(gamemap, mapindex, vswap, rooms):
                 continue
             elif code in WALL_CODES and gamemap.tiles[OBJECT_PLANE][y][x] in PUSHWALL_CODES:
                 # These faces face *outwards* from the tile.
-                texture_name_ew = load_texture("wall", get_wall_texture_id(code, _FACING_EW))
-                texture_name_ns = load_texture("wall", get_wall_texture_id(code, _FACING_NS))
-                # ns_texture_id = get_wall_texture_id(code, _FACING_NS)
+                texture_name_ew = load_texture("wall", _get_wall_texture_id(code, _FACING_EW))
+                texture_name_ns = load_texture("wall", _get_wall_texture_id(code, _FACING_NS))
+                # ns_texture_id = _get_wall_texture_id(code, _FACING_NS)
                 pushwall_faces.append((
                         (texture_name_ns, (
                             _get_wall_face(x, y + 1, x + 1, y + 1),  # South, outwards
@@ -259,11 +367,194 @@ def _export_rooms(gamemap, mapindex, vswap, rooms):
     obj.save(os.path.join(EXPORT_PATH, f"map{mapindex:02}.obj"))
 
 
-def export_map(gamemapsfile, vswapfile, palette, mapindex):
+def _merge_solid_boxes(solid, width, height):
+    """Greedily merges solid tiles into axis-aligned boxes: runs along x first, then grown along y."""
+    used = [[False] * width for _ in range(height)]
+    boxes = []
+    for y in range(height):
+        x = 0
+        while x < width:
+            if not solid[y][x] or used[y][x]:
+                x += 1
+                continue
+            x2 = x
+            while x2 < width and solid[y][x2] and not used[y][x2]:
+                x2 += 1
+            y2 = y + 1
+            while y2 < height and all(solid[y2][tx] and not used[y2][tx] for tx in range(x, x2)):
+                y2 += 1
+            for ty in range(y, y2):
+                for tx in range(x, x2):
+                    used[ty][tx] = True
+            boxes.append((x, y, x2 - x, y2 - y))
+            x = x2
+    return boxes
+
+
+def _export_collision(gamemap, mapindex, rooms):
+    collision = CollisionFile(gamemap.width, gamemap.height)
+    solid = [[False] * gamemap.width for _ in range(gamemap.height)]
+    for y in range(gamemap.height):
+        for x in range(gamemap.width):
+            code = gamemap.tiles[WALL_PLANE][y][x]
+            if code in WALL_CODES:
+                if gamemap.tiles[OBJECT_PLANE][y][x] in PUSHWALL_CODES:
+                    collision.add_pushwall(x, y)
+                else:
+                    solid[y][x] = True
+            elif code in FLOOR_CODES or code in FLOOR_MARKERS or code in DOOR_EW_CODES or code in DOOR_NS_CODES:
+                collision.set_walkable(x, y)
+    for box in _merge_solid_boxes(solid, gamemap.width, gamemap.height):
+        collision.add_box(*box)
+    # Doors connect the rooms on either side of them.
+    tile_rooms = {}
+    for floor_code, tiles in rooms.items():
+        collision.add_room(floor_code)
+        for tile in tiles:
+            tile_rooms[tile] = floor_code
+
+    def get_room(tx, ty):
+        if 0 <= tx < gamemap.width and 0 <= ty < gamemap.height:
+            code = gamemap.tiles[WALL_PLANE][ty][tx]
+            if code not in DOOR_EW_CODES and code not in DOOR_NS_CODES:
+                return tile_rooms.get((tx, ty))
+        return None
+
+    for y in range(gamemap.height):
+        for x in range(gamemap.width):
+            code = gamemap.tiles[WALL_PLANE][y][x]
+            if code in DOOR_EW_CODES:
+                room_a, room_b = get_room(x - 1, y), get_room(x + 1, y)
+            elif code in DOOR_NS_CODES:
+                room_a, room_b = get_room(x, y - 1), get_room(x, y + 1)
+            else:
+                continue
+            if room_a is None or room_b is None:
+                logger.warning(f"Could not find both rooms for door at {x}, {y}.")
+                continue
+            collision.add_door(x, y, room_a, room_b)
+    collision.save(os.path.join(EXPORT_PATH, f"map{mapindex:02}.col"))
+
+
+def _export_map(maps, mapindex, texture_exporter):
+    gamemap = maps.load_map(mapindex)
+    rooms = scan_for_rooms(gamemap)
+    _export_rooms(gamemap, mapindex, texture_exporter, rooms)
+    if EXPORT_COLLISION:
+        _export_collision(gamemap, mapindex, rooms)
+
+
+def _open_vswap(vswapfile, palette):
+    """Returns None when textures are not exported, so VSWAP is never opened."""
+    if not EXPORT_TEXTURES:
+        return None
+    vswap = Vswap(vswapfile)
+    vswap.set_palette(palette)
+    return vswap
+
+
+def export_maps(gamemapsfile, vswapfile, palette, mapindices, threads=None):
+    """Exports several maps on a thread pool that shares one GameMaps and Vswap reader.
+    `threads` sizes both the map pool and the TextureExporter pool, so up to twice that many workers run.
+    """
+    # Duplicates would have two workers writing the same files.
+    mapindices = list(dict.fromkeys(mapindices))
     with GameMaps(gamemapsfile) as maps:
-        with Vswap(vswapfile) as vswap:
-            vswap.set_palette(palette)
-            gamemap = maps.load_map(mapindex)
-            rooms = _scan_for_rooms(gamemap)
+        vswap = _open_vswap(vswapfile, palette)
+        try:
             os.makedirs(EXPORT_PATH, exist_ok=True)
-            _export_rooms(gamemap, mapindex, vswap, rooms)
+            with TextureExporter(vswap, threads) as texture_exporter:
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    futures = [executor.submit(_export_map, maps, mapindex, texture_exporter)
+                               for mapindex in mapindices]
+                    for future in futures:
+                        future.result()
+        finally:
+            if vswap:
+                vswap.close()
+
+
+def export_map(gamemapsfile, vswapfile, palette, mapindex):
+    export_maps(gamemapsfile, vswapfile, palette, [mapindex], threads=1)
+
+
+def _read_map_planes(maps, mapindex):
+    info = maps.load_map_info(mapindex)
+    return [maps.read_plane(info, plane) for plane in range(maps.MAPPLANES)]
+
+
+def watch_maps(gamemapsfile, vswapfile, palette, mapindices, threads=None, interval=0.5):
+    """Exports the maps, then polls the game files and re-exports only the maps whose
+    compressed planes changed. Textures that were already exported are reused unless
+    VSWAP changes. Runs until interrupted.
+    """
+    mapindices = list(dict.fromkeys(mapindices))
+    headerfile = find_file(gamemapsfile, GameMaps.MAPHEAD_NAME)
+    os.makedirs(EXPORT_PATH, exist_ok=True)
+    maps = None
+    vswap = None
+    vswap_stamp = None
+    texture_exporter = None
+    planes = {}
+    stamps = None
+    missing = False
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            while True:
+                try:
+                    new_stamps = [file_stamp(headerfile), file_stamp(gamemapsfile),
+                                  file_stamp(vswapfile) if EXPORT_TEXTURES else None]
+                    missing = False
+                except FileNotFoundError as e:
+                    # Some editors delete a file before writing it again, so only the first poll is fatal.
+                    if stamps is None:
+                        raise
+                    if not missing:
+                        logger.warning(f"Waiting for missing file: {e.filename}")
+                    missing = True
+                    new_stamps = stamps
+                if new_stamps != stamps:
+                    stamps = new_stamps
+                    try:
+                        if texture_exporter is None or new_stamps[2] != vswap_stamp:
+                            if texture_exporter:
+                                texture_exporter.close()
+                                texture_exporter = None
+                            if vswap:
+                                vswap.close()
+                            vswap = _open_vswap(vswapfile, palette)
+                            texture_exporter = TextureExporter(vswap, threads)
+                            vswap_stamp = new_stamps[2]
+                            planes.clear()
+                        # MAPHEAD may have moved the maps, so always reload the header.
+                        if maps:
+                            maps.close()
+                        maps = GameMaps(gamemapsfile)
+                        changed = {}
+                        for mapindex in mapindices:
+                            map_planes = _read_map_planes(maps, mapindex)
+                            if planes.get(mapindex) != map_planes:
+                                changed[mapindex] = map_planes
+                        futures = [executor.submit(_export_map, maps, mapindex, texture_exporter)
+                                   for mapindex in changed]
+                        # Let every export finish before reporting errors. The readers may be
+                        # closed and reopened on the next change.
+                        wait_for_futures(futures)
+                        texture_exporter.wait()
+                        for future in futures:
+                            future.result()
+                        planes.update(changed)
+                        if changed:
+                            logger.info(f"Exported map(s) {', '.join(str(index) for index in changed)}")
+                    except Exception:
+                        logger.exception("Export failed. Waiting for the game files to change.")
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if texture_exporter:
+            texture_exporter.close()
+        if vswap:
+            vswap.close()
+        if maps:
+            maps.close()
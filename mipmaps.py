@@ -0,0 +1,63 @@
+import struct
+import typing
+if typing.TYPE_CHECKING:
+    import PIL.Image
+
+# https://registry.khronos.org/KTX/specs/1.0/ktxspec.v1.html
+KTX_IDENTIFIER = b"\xabKTX 11\xbb\r\n\x1a\n"
+KTX_ENDIANNESS = 0x04030201
+GL_UNSIGNED_BYTE = 0x1401
+GL_RGBA = 0x1908
+GL_RGBA8 = 0x8058
+
+MIP_FILTERS = ("nearest", "box")
+
+
+def scale_image(image: "PIL.Image.Image", scale: int) -> "PIL.Image.Image":
+    """Upscales by a power-of-two factor. Nearest neighbor keeps the pixels sharp."""
+    import PIL.Image
+    if scale == 1:
+        return image
+    return image.resize((image.width * scale, image.height * scale), PIL.Image.NEAREST)
+
+
+def build_mip_chain(image: "PIL.Image.Image", mip_filter: str = "box") -> "list[PIL.Image.Image]":
+    """Returns the full mip chain, starting with `image` and ending with a 1x1 level."""
+    import PIL.Image
+    if mip_filter not in MIP_FILTERS:
+        raise ValueError(f"Unknown mip filter: {mip_filter}")
+    if mip_filter == "box":
+        # Averaging palette indices is meaningless, so box filtering works on RGBA.
+        image = image.convert("RGBA")
+    levels = [image]
+    while image.width > 1 or image.height > 1:
+        size = max(image.width // 2, 1), max(image.height // 2, 1)
+        if mip_filter == "box":
+            image = image.reduce((image.width // size[0], image.height // size[1]))
+        else:
+            image = image.resize(size, PIL.Image.NEAREST)
+        levels.append(image)
+    return levels
+
+
+def save_png_levels(levels: "list[PIL.Image.Image]", basename: str):
+    """Saves level 0 as `basename`.png and each smaller level as `basename`_mipN.png."""
+    for level, image in enumerate(levels):
+        suffix = f"_mip{level}" if level else ""
+        image.save(f"{basename}{suffix}.png")
+
+
+def save_ktx(levels: "list[PIL.Image.Image]", file):
+    """Saves the mip chain as an uncompressed RGBA8 KTX 1.1 texture."""
+    with open(file, "wb") as f:
+        f.write(KTX_IDENTIFIER)
+        f.write(struct.pack("<13I",
+                            KTX_ENDIANNESS,
+                            GL_UNSIGNED_BYTE, 1, GL_RGBA, GL_RGBA8, GL_RGBA,
+                            levels[0].width, levels[0].height, 0,
+                            0, 1, len(levels), 0))
+        for image in levels:
+            # RGBA rows are always a multiple of 4 bytes, so no padding is needed.
+            data = image.convert("RGBA").tobytes()
+            f.write(struct.pack("<I", len(data)))
+            f.write(data)
@@ -0,0 +1,90 @@
+# Little-endian binary layout:
+#   magic "W3DC", version (uint16), width (uint16), height (uint16)
+#   box count (uint32), boxes as x, y, width, height (uint16 each)
+#   walkable bitmap, one bit per tile in row order, least significant bit first
+#   pushwall count (uint32), pushwalls as x, y (uint16 each)
+#   room count (uint32), room floor codes (uint16 each)
+#   door count (uint32), doors as x, y, room_a, room_b (uint16 each)
+import struct
+
+
+class CollisionFile:
+    MAGIC = b"W3DC"
+    VERSION = 1
+
+    def __init__(self, width=0, height=0):
+        self.width = width
+        self.height = height
+        self.boxes = []  # (x, y, width, height)
+        self.walkable = bytearray((width * height + 7) // 8)
+        self.pushwalls = []  # (x, y)
+        self.rooms = []  # floor codes
+        self.doors = []  # (x, y, room_a, room_b)
+
+    def add_box(self, x, y, width, height):
+        self.boxes.append((x, y, width, height))
+
+    def set_walkable(self, x, y, walkable=True):
+        bit = y * self.width + x
+        if walkable:
+            self.walkable[bit >> 3] |= 1 << (bit & 7)
+        else:
+            self.walkable[bit >> 3] &= ~(1 << (bit & 7))
+
+    def is_walkable(self, x, y):
+        bit = y * self.width + x
+        return bool(self.walkable[bit >> 3] & (1 << (bit & 7)))
+
+    def add_pushwall(self, x, y):
+        self.pushwalls.append((x, y))
+
+    def add_room(self, floor_code):
+        self.rooms.append(floor_code)
+
+    def add_door(self, x, y, room_a, room_b):
+        self.doors.append((x, y, room_a, room_b))
+
+    def save(self, file):
+        with open(file, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(struct.pack('<3H', self.VERSION, self.width, self.height))
+            f.write(struct.pack('<I', len(self.boxes)))
+            for box in self.boxes:
+                f.write(struct.pack('<4H', *box))
+            f.write(self.walkable)
+            f.write(struct.pack('<I', len(self.pushwalls)))
+            for pushwall in self.pushwalls:
+                f.write(struct.pack('<2H', *pushwall))
+            f.write(struct.pack(f'<I{len(self.rooms)}H', len(self.rooms), *self.rooms))
+            f.write(struct.pack('<I', len(self.doors)))
+            for door in self.doors:
+                f.write(struct.pack('<4H', *door))
+
+    @classmethod
+    def load(cls, file):
+        with open(file, 'rb') as f:
+            data = f.read()
+        if data[:4] != cls.MAGIC:
+            raise ValueError(f"Not a collision file: {file}")
+        version, width, height = struct.unpack_from('<3H', data, 4)
+        if version != cls.VERSION:
+            raise ValueError(f"Unsupported collision file version: {version}")
+        result = cls(width, height)
+        offset = 10
+
+        def read_records(fmt):
+            nonlocal offset
+            count, = struct.unpack_from('<I', data, offset)
+            offset += 4
+            size = struct.calcsize(f'<{fmt}')
+            records = [struct.unpack_from(f'<{fmt}', data, offset + i * size) for i in range(count)]
+            offset += count * size
+            return records
+
+        result.boxes = read_records('4H')
+        result.walkable = bytearray(data[offset:offset + len(result.walkable)])
+        offset += len(result.walkable)
+        result.pushwalls = read_records('2H')
+        result.rooms = [room for room, in read_records('H')]
+        result.doors = read_records('4H')
+        return result
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 import typing as _typing
 from .utils import *
 
-__all__ = ["GameMaps", "GameMap"]
+__all__ = ["GameMaps", "GameMap", "MapInfo"]
 
 
 @dataclass
@@ -62,19 +62,29 @@ class GameMaps:
         return MapHead(rlew_tag, header_offsets)
 
     def load_map_info(self, index: int):
-        self.f.seek(self.header.offsets[index])
-        planestart = self.f.read_uint32_array(self.MAPPLANES)
-        planelength = self.f.read_uint16_array(self.MAPPLANES)
-        width, height = self.f.read_uint16_array(2)
-        name = self.f.read_text(self.NAME_LENGTH)
+        info_length = self.MAPPLANES * 4 + self.MAPPLANES * 2 + 2 * 2 + self.NAME_LENGTH
+        data = BytesReader(self.f.read_at(self.header.offsets[index], info_length))
+        planestart = data.read_uint32_array(self.MAPPLANES)
+        planelength = data.read_uint16_array(self.MAPPLANES)
+        width, height = data.read_uint16_array(2)
+        name = data.read_text(self.NAME_LENGTH)
         return MapInfo(planestart, planelength, width, height, name)
 
+    def has_map(self, index: int) -> bool:
+        return 0 <= index < len(self.header.offsets) and self.header.offsets[index] != 0
+
+    def read_plane(self, info: MapInfo, plane: int) -> bytes:
+        """Returns the compressed data for a map plane."""
+        return self.f.read_at(info.plane_start[plane], info.plane_length[plane])
+
     def load_map(self, index: int):
         info = self.load_map_info(index)
+        return self.decode_map(info, [self.read_plane(info, plane) for plane in range(self.MAPPLANES)])
+
+    def decode_map(self, info: MapInfo, planes: _typing.List[bytes]):
+        """Expands the compressed plane data returned by `read_plane`."""
         data = []
-        for plane in range(self.MAPPLANES):
-            self.f.seek(info.plane_start[plane])
-            plane_data = self.f.read(info.plane_length[plane])
+        for plane_data in planes:
             if self.CARMACIZED:
                 plane_data = self.carmack_expand(plane_data)
             plane_data = self.rlew_expand(plane_data)
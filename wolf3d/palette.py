@@ -1,6 +1,4 @@
-import PIL.ImagePalette
-
-
 def load_palette(file):
+    import PIL.ImagePalette
     with open(file, "rb") as fp:
         return PIL.ImagePalette.ImagePalette(mode="RGB", palette=fp.read())
@@ -1,5 +1,6 @@
 import os as _os
 import struct as _struct
+import threading as _threading
 
 
 def find_file(basefile, findfile):
@@ -9,6 +10,12 @@ def find_file(basefile, findfile):
     return _os.path.join(basepath, findfile + ext)
 
 
+def file_stamp(file) -> list[int]:
+    """Returns the size and modification time of `file` for detecting changes."""
+    stat = _os.stat(file)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
 def get_ubyte(data, offset: int = 0) -> int:
     """Returns an unsigned byte."""
     return _struct.unpack('B', data[offset])[0]
@@ -124,6 +131,7 @@ class BytesReader:
 class BinaryFileReader:
     def __init__(self, file):
         self.__f = open(file, "rb")
+        self.__lock = _threading.Lock()
 
     def __enter__(self):
         return self
@@ -134,6 +142,21 @@ class BinaryFileReader:
     def read(self, n: int = -1) -> bytes:
         return self.__f.read(n)
 
+    def read_at(self, offset: int, n: int) -> bytes:
+        """Reads `n` bytes at `offset` without using the file position, so it is safe to call from multiple threads."""
+        if hasattr(_os, "pread"):
+            fd = self.__f.fileno()
+            result = _os.pread(fd, n, offset)
+            while len(result) < n:
+                chunk = _os.pread(fd, n - len(result), offset + len(result))
+                if not chunk:
+                    break
+                result += chunk
+            return result
+        with self.__lock:
+            self.__f.seek(offset)
+            return self.__f.read(n)
+
     def seek(self, offset: int, whence: int = 0) -> int:
         return self.__f.seek(offset, whence)
 
@@ -1,6 +1,3 @@
-import PIL
-import PIL.Image
-import PIL.ImageOps
 import typing
 from .utils import *
 if typing.TYPE_CHECKING:
@@ -35,11 +32,13 @@ class Vswap:
         self.palette = palette
 
     def load_wall(self, index):
+        # Pillow is only imported when textures are actually needed.
+        import PIL.Image
+        import PIL.ImageOps
         assert 0 <= index < self.sprite_start, "Not a wall index."
         assert self.palette, "Palette not set."
-        self.f.seek(self.offsets[index])
         assert self.lengths[index] == self.TEXTURE_SIZE * self.TEXTURE_SIZE, f"Unexpected length: {self.lengths[index]}"
-        data = self.f.read(self.lengths[index])
+        data = self.f.read_at(self.offsets[index], self.lengths[index])
         image = PIL.Image.new("P", (self.TEXTURE_SIZE, self.TEXTURE_SIZE))
         image.putpalette(self.palette)
         image.putdata(data)